@@ -18,6 +18,6 @@ def always_explode_on_error(
     Ensures that we do not log errors or exceptions during testing.
 
     If your test is checking error handling behavior (and you expect to see a log_exception call),
-    use the `expect_exact_logged_errors` decorator to suppress the logging of those errors.
+    use the `expect_exact_logged_errors` decorator to mark those errors as expected.
     """
     yield
@@ -483,6 +483,8 @@ class AnthropicAPI(LanguageModelAPI):
         ), "Anthropic API only supports count=1.  It is possible to hack around this by using a for loop, but doesn't seem worth it right now."
 
         non_system_messages, system_messages = _convert_prompt_to_anthropic_messages(prompt)
+        stop = params.stop
+        stop_sequences = [stop] if stop is not None else NOT_GIVEN
 
         with _anthropic_exception_manager():
             async with self._get_client() as client:
@@ -512,7 +514,7 @@ class AnthropicAPI(LanguageModelAPI):
                     model_name = _LONG_TO_STANDARD[self.model_name]
                     api_result = await client.beta.messages.create(
                         messages=non_system_messages,
-                        stop_sequences=([params.stop] if params.stop is not None else NOT_GIVEN),
+                        stop_sequences=stop_sequences,
                         model=model_name,
                         temperature=NOT_GIVEN if self.model_name in _MODELS_WITHOUT_TEMPERATURE else params.temperature,
                         system=prepend_claude_code_system_prompt(system_messages),
@@ -526,7 +528,7 @@ class AnthropicAPI(LanguageModelAPI):
                 else:
                     api_result = await client.messages.create(
                         messages=non_system_messages,
-                        stop_sequences=([params.stop] if params.stop is not None else NOT_GIVEN),
+                        stop_sequences=stop_sequences,
                         model=self.model_name,
                         temperature=NOT_GIVEN if self.model_name in _MODELS_WITHOUT_TEMPERATURE else params.temperature,
                         system=prepend_claude_code_system_prompt(system_messages),
@@ -543,8 +545,8 @@ class AnthropicAPI(LanguageModelAPI):
                     )
                 else:
                     stop_reason = ResponseStopReason.NONE
-                if params.stop and stop_reason == ResponseStopReason.STOP_SEQUENCE:
-                    text += params.stop
+                if stop and stop_reason == ResponseStopReason.STOP_SEQUENCE:
+                    text += stop
                 logger.trace(text)
 
                 prompt_tokens = api_result.usage.input_tokens
@@ -572,6 +574,8 @@ class AnthropicAPI(LanguageModelAPI):
         params: LanguageModelGenerationParams,
     ) -> AsyncGenerator[LanguageModelStreamEvent, None]:
         non_system_messages, system_messages = _convert_prompt_to_anthropic_messages(prompt)
+        stop = params.stop
+        stop_sequences = [stop] if stop is not None else NOT_GIVEN
         with _anthropic_exception_manager():
             async with self._get_client() as client:
                 yield LanguageModelStreamStartEvent()
@@ -607,7 +611,7 @@ class AnthropicAPI(LanguageModelAPI):
                     max_tokens=max_tokens,
                     messages=non_system_messages,
                     model=model_name,
-                    stop_sequences=([params.stop] if params.stop is not None else NOT_GIVEN),
+                    stop_sequences=stop_sequences,
                     system=system_messages or NOT_GIVEN,
                     temperature=NOT_GIVEN if self.model_name in _MODELS_WITHOUT_TEMPERATURE else params.temperature,
                 ) as stream:
@@ -619,9 +623,9 @@ class AnthropicAPI(LanguageModelAPI):
                     stop_reason = (
                         final_message.stop_reason if final_message.stop_reason is not None else ResponseStopReason.NONE
                     )
-                    if params.stop and stop_reason == ResponseStopReason.STOP_SEQUENCE:
-                        yield LanguageModelStreamDeltaEvent(delta=params.stop)
-                        text += params.stop
+                    if stop and stop_reason == ResponseStopReason.STOP_SEQUENCE:
+                        yield LanguageModelStreamDeltaEvent(delta=stop)
+                        text += stop
                     logger.trace(text)
 
                     prompt_tokens = final_message.usage.input_tokens
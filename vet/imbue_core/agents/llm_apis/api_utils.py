@@ -24,6 +24,14 @@ _ROLE_TO_OPENAI_ROLE: Final[FrozenMapping] = FrozenDict(
         "USER_CACHED": "user",
     }
 )
+# used when the caller needs to know which messages were marked for caching (e.g. to set Anthropic cache breakpoints)
+_ROLE_TO_OPENAI_ROLE_WITH_CACHE_ROLES: Final[FrozenMapping] = FrozenDict(
+    {
+        **_ROLE_TO_OPENAI_ROLE,
+        "SYSTEM_CACHED": "SYSTEM_CACHED",
+        "USER_CACHED": "USER_CACHED",
+    }
+)
 
 
 def convert_prompt_to_messages(prompt: str, is_cache_role_preserved: bool = False) -> tuple[ConversationMessage, ...]:
@@ -78,33 +86,18 @@ def create_costed_language_model_response_for_single_result(
 
 # FIXME: we should make sure that all our LLM providers use the same function here, some clean up is required
 def convert_prompt_to_openai_messages(prompt: str, is_cache_role_preserved: bool = False) -> list[dict[str, str]]:
-    prompt = prompt.lstrip()
-    assert prompt.startswith("[ROLE=")
-    prompt = prompt.replace("[ROLE=", "", 1)
+    stripped_prompt = prompt.lstrip()
+    prompt = stripped_prompt.removeprefix("[ROLE=")
+    assert prompt != stripped_prompt, "Prompt must start with a [ROLE=...] header"
     chunks = prompt.split("\n[ROLE=")
+    role_map = _ROLE_TO_OPENAI_ROLE_WITH_CACHE_ROLES if is_cache_role_preserved else _ROLE_TO_OPENAI_ROLE
     messages: list[dict[str, str]] = []
     for chunk in chunks:
-        lines = chunk.split("\n")
-        role = lines[0].strip().rstrip("]")
-        assert role in (
-            "HUMAN",
-            "ASSISTANT",
-            "USER",
-            "SYSTEM",
-            "SYSTEM_CACHED",
-            "USER_CACHED",
-        ), f"Unknown role {role} in prompt {prompt}"
-        lines.pop(0)
-        if role == "HUMAN":
-            role = "USER"
+        # only the first line holds the role, so split it off without breaking the (possibly huge) content into lines
+        role_line, _, content = chunk.partition("\n")
+        role = role_line.strip().rstrip("]")
+        assert role in role_map, f"Unknown role {role} in prompt {prompt}"
         if len(messages) > 0:
             messages[-1]["content"] = messages[-1]["content"] + "\n"
-        content = "\n".join(lines)
-        content = content.rstrip()
-        fixed_role = _ROLE_TO_OPENAI_ROLE[role]
-        if is_cache_role_preserved and role == "SYSTEM_CACHED":
-            fixed_role = "SYSTEM_CACHED"
-        elif is_cache_role_preserved and role == "USER_CACHED":
-            fixed_role = "USER_CACHED"
-        messages.append({"role": fixed_role, "content": content})
+        messages.append({"role": role_map[role], "content": content.rstrip()})
     return messages
@@ -10,13 +10,16 @@ from types import FrameType
 from typing import AsyncGenerator
 from typing import Awaitable
 from typing import Callable
+from typing import Sequence
 from typing import TypeVar
+from typing import cast
 from typing import final
 from uuid import UUID
 from uuid import uuid4
 
 import anyio
 from loguru import logger
+from pydantic import PrivateAttr
 
 from vet.imbue_core.agents.llm_apis.constants import approximate_token_count
 from vet.imbue_core.agents.llm_apis.data_types import CachedCostedLanguageModelResponse
@@ -41,7 +44,6 @@ from vet.imbue_core.agents.llm_apis.stream import PromptDebuggingCallback
 from vet.imbue_core.agents.llm_apis.stream import SettleSpendCallback
 from vet.imbue_core.agents.llm_apis.stream import StreamedLanguageModelResponse
 from vet.imbue_core.agents.llm_apis.stream import UpdateCacheCallback
-from vet.imbue_core.agents.llm_apis.stream import get_cached_response_stream
 from vet.imbue_core.agents.primitives.resource_limits import PaymentAuthorization
 from vet.imbue_core.agents.primitives.resource_limits import get_global_resource_limits
 from vet.imbue_core.async_utils import sync
@@ -87,6 +89,8 @@ class LanguageModelAPI(abc.ABC, MutableModel):
     retry_backoff_factor: float = 3.0
     retry_jitter_factor: float = 0.5
 
+    _cost_per_token_by_model_name: tuple[str, float, float] | None = PrivateAttr(default=None)
+
     # TODO: Consider storing the model_config here as well.
 
     @property
@@ -107,6 +111,9 @@ class LanguageModelAPI(abc.ABC, MutableModel):
                 "api_key_env",
                 "context_window",
                 "max_output_tokens",
+                "request_timeout_seconds",
+                "request_connect_timeout_seconds",
+                "sdk_max_retries",
             }
         )
         # have to reset the offline key to the same value so that that doesnt invalidate the cache
@@ -229,6 +236,39 @@ class LanguageModelAPI(abc.ABC, MutableModel):
 
     complete_with_usage_sync = sync(complete_with_usage)
 
+    async def complete_many_with_usage(
+        self,
+        prompts: Sequence[str],
+        params: LanguageModelGenerationParams,
+        is_caching_enabled: bool = True,
+        max_concurrency: int | None = None,
+    ) -> tuple[CostedLanguageModelResponse, ...]:
+        """Run complete_with_usage for many prompts concurrently, returning the responses in the same order.
+
+        Each prompt still goes through caching, retries and spend authorization. At most `max_concurrency` prompts are
+        in flight at once; None means all of them, which is only reasonable for small batches or for APIs that pace
+        their own requests. Every request is allowed to finish even if others fail; a single failure is re-raised as
+        is, multiple failures as an ExceptionGroup.
+        """
+        assert max_concurrency is None or max_concurrency > 0, "max_concurrency must be positive"
+        semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency is not None else None
+
+        async def complete_one(prompt: str) -> CostedLanguageModelResponse:
+            if semaphore is None:
+                return await self.complete_with_usage(prompt, params, is_caching_enabled)
+            async with semaphore:
+                return await self.complete_with_usage(prompt, params, is_caching_enabled)
+
+        results = await asyncio.gather(*(complete_one(prompt) for prompt in prompts), return_exceptions=True)
+        exceptions = [result for result in results if isinstance(result, BaseException)]
+        if len(exceptions) == 1:
+            raise exceptions[0]
+        elif len(exceptions) > 1:
+            raise BaseExceptionGroup(f"{len(exceptions)} of {len(prompts)} completions failed", exceptions)
+        return tuple(cast(list[CostedLanguageModelResponse], results))
+
+    complete_many_with_usage_sync = sync(complete_many_with_usage)
+
     async def _complete_with_usage(
         self,
         prompt: str,
@@ -301,7 +341,10 @@ class LanguageModelAPI(abc.ABC, MutableModel):
                         max_jitter = sleep_time * self.retry_jitter_factor
                         sleep_time += random.uniform(-max_jitter / 2, max_jitter / 2)
                     logger.debug(
-                        f"Transient language model error ({str(e)}) in model {self.model_name}, retrying with sleep time {sleep_time} seconds..."
+                        "Transient language model error ({error}) in model {model_name}, retrying with sleep time {sleep_time} seconds...",
+                        error=e,
+                        model_name=self.model_name,
+                        sleep_time=sleep_time,
                     )
                     await asyncio.sleep(sleep_time)
                     sleep_time *= self.retry_backoff_factor
@@ -372,11 +415,7 @@ class LanguageModelAPI(abc.ABC, MutableModel):
 
         # Note it's technically possible multiple responses cached for given prompt (e.g. from call to complete())
         # for now we just return first one
-        costed_response_to_output = lambda cr: StreamedLanguageModelResponse(
-            get_cached_response_stream(cr),
-            network_failure_count=0,
-            completion_callbacks=(),
-        )
+        costed_response_to_output = StreamedLanguageModelResponse.from_cached
         cache_key: str | None = None
         if is_caching_enabled:
             cache_key, cached_response = await self._get_from_cache(frame, costed_response_to_output)
@@ -438,7 +477,10 @@ class LanguageModelAPI(abc.ABC, MutableModel):
                     if self.retry_jitter_factor > 0:
                         sleep_time += random.uniform(0, sleep_time * self.retry_jitter_factor)
                     logger.debug(
-                        f"Transient language model error ({str(e)}) in model {self.model_name}, retrying with sleep time {sleep_time} seconds..."
+                        "Transient language model error ({error}) in model {model_name}, retrying with sleep time {sleep_time} seconds...",
+                        error=e,
+                        model_name=self.model_name,
+                        sleep_time=sleep_time,
                     )
                     await asyncio.sleep(sleep_time)
                     sleep_time *= self.retry_backoff_factor
@@ -500,11 +542,19 @@ class LanguageModelAPI(abc.ABC, MutableModel):
         # this is VERY approximate, but many of the child models have nothing, so...
         return approximate_token_count(text)
 
+    def _get_cost_per_token(self) -> tuple[float, float]:
+        # model_info may build a fresh ModelInfo on every access, so remember the rates (keyed on the model name in
+        # case this instance is copied with a different model)
+        cached = self._cost_per_token_by_model_name
+        if cached is None or cached[0] != self.model_name:
+            model_info = self.model_info
+            cached = (self.model_name, model_info.cost_per_input_token, model_info.cost_per_output_token)
+            self._cost_per_token_by_model_name = cached
+        return cached[1], cached[2]
+
     def basic_calculate_cost(self, prompt_tokens: int, completion_tokens: int) -> float:
-        return (
-            prompt_tokens * self.model_info.cost_per_input_token
-            + completion_tokens * self.model_info.cost_per_output_token
-        )
+        cost_per_input_token, cost_per_output_token = self._get_cost_per_token()
+        return prompt_tokens * cost_per_input_token + completion_tokens * cost_per_output_token
 
     def estimate_cost(self, prompt_tokens: int, completion_tokens: int) -> float:
         """Estimate the cost of a request before it has been made. Doesn't use any caching info."""
@@ -517,8 +567,11 @@ class LanguageModelAPI(abc.ABC, MutableModel):
         caching_info: CachingInfo | None = None,
     ) -> float:
         """Overridden by subclasses which have more complex cost calculations, such as if caching is used."""
+        if self._get_cost_per_token() == (0.0, 0.0):
+            # free models (e.g. self-hosted OpenAI-compatible ones) are called a lot, so skip the logging entirely
+            return 0.0
         logger.debug(
-            f"no calculate_cost implemented for {self.model_name}; using basic_calculate_cost",
+            "no calculate_cost implemented for {model_name}; using basic_calculate_cost",
             model_name=self.model_name,
         )
         return self.basic_calculate_cost(prompt_tokens, completion_tokens)
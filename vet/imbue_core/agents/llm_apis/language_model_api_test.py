@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from vet.imbue_core.agents.llm_apis.data_types import CostedLanguageModelResponse
+from vet.imbue_core.agents.llm_apis.data_types import LanguageModelGenerationParams
+from vet.imbue_core.agents.llm_apis.data_types import LanguageModelResponse
+from vet.imbue_core.agents.llm_apis.data_types import LanguageModelResponseUsage
+from vet.imbue_core.agents.llm_apis.data_types import ResponseStopReason
+from vet.imbue_core.agents.llm_apis.mock_api import LanguageModelMock
+
+_PARAMS = LanguageModelGenerationParams(temperature=0.0)
+
+
+class _EchoLanguageModel(LanguageModelMock):
+    """Echoes prompts back after a delay that shrinks with their position, failing on prompts that start with 'fail'."""
+
+    in_flight_count: int = 0
+    max_in_flight_count: int = 0
+
+    async def complete_with_usage(
+        self,
+        prompt: str,
+        params: LanguageModelGenerationParams,
+        is_caching_enabled: bool = True,
+    ) -> CostedLanguageModelResponse:
+        self.in_flight_count += 1
+        self.max_in_flight_count = max(self.max_in_flight_count, self.in_flight_count)
+        try:
+            # later prompts finish first, so that ordering by completion would be visible
+            await asyncio.sleep(0.001 * (10 - int(prompt.split()[-1])))
+        finally:
+            self.in_flight_count -= 1
+        if prompt.startswith("fail"):
+            raise ValueError(prompt)
+        return CostedLanguageModelResponse(
+            usage=LanguageModelResponseUsage(prompt_tokens_used=1, completion_tokens_used=1, dollars_used=0.0),
+            responses=(
+                LanguageModelResponse(
+                    text=prompt, token_count=1, stop_reason=ResponseStopReason.END_TURN, network_failure_count=0
+                ),
+            ),
+        )
+
+
+def test_complete_many_keeps_prompt_order() -> None:
+    prompts = [f"prompt {i}" for i in range(10)]
+    responses = _EchoLanguageModel().complete_many_with_usage_sync(prompts, _PARAMS)
+    assert [response.responses[0].text for response in responses] == prompts
+
+
+def test_complete_many_respects_max_concurrency() -> None:
+    model = _EchoLanguageModel()
+    prompts = [f"prompt {i}" for i in range(10)]
+    responses = model.complete_many_with_usage_sync(prompts, _PARAMS, max_concurrency=3)
+    assert [response.responses[0].text for response in responses] == prompts
+    assert model.max_in_flight_count == 3
+
+
+def test_complete_many_reraises_a_single_failure_as_is() -> None:
+    with pytest.raises(ValueError, match="fail 3"):
+        _EchoLanguageModel().complete_many_with_usage_sync(["prompt 1", "fail 3", "prompt 5"], _PARAMS)
+
+
+def test_complete_many_groups_multiple_failures() -> None:
+    with pytest.raises(ExceptionGroup) as exc_info:
+        _EchoLanguageModel().complete_many_with_usage_sync(["fail 1", "prompt 2", "fail 3"], _PARAMS)
+    assert sorted(str(exception) for exception in exc_info.value.exceptions) == ["fail 1", "fail 3"]
@@ -1,12 +1,9 @@
-import asyncio
 import enum
 import re
-from collections import defaultdict
 from contextlib import contextmanager
 from functools import lru_cache
 from typing import AsyncGenerator
 from typing import Iterator
-from typing import Mapping
 
 import httpx
 import tiktoken
@@ -20,6 +17,7 @@ from openai._exceptions import APIConnectionError
 from openai._exceptions import BadRequestError
 from openai._exceptions import RateLimitError
 from openai.types.chat import ChatCompletion
+from openai.types.chat import ChatCompletionTokenLogprob
 from pydantic.functional_validators import field_validator
 
 from vet.imbue_core.agents.llm_apis.api_utils import convert_prompt_to_openai_messages
@@ -44,6 +42,7 @@ from vet.imbue_core.agents.llm_apis.stream import LanguageModelStreamDeltaEvent
 from vet.imbue_core.agents.llm_apis.stream import LanguageModelStreamEndEvent
 from vet.imbue_core.agents.llm_apis.stream import LanguageModelStreamEvent
 from vet.imbue_core.agents.llm_apis.stream import LanguageModelStreamStartEvent
+from vet.imbue_core.agents.primitives.rate_limits import AsyncTokenBucket
 from vet.imbue_core.frozen_utils import FrozenDict
 from vet.imbue_core.frozen_utils import FrozenMapping
 from vet.imbue_core.itertools import only
@@ -165,6 +164,8 @@ OPENAI_MODEL_INFO_BY_NAME: FrozenMapping[OpenAIModelName, ModelInfo] = FrozenDic
 
 
 # Pricing for fine-tuned models taken from here: https://platform.openai.com/docs/pricing
+# (cached since this is looked up on every request, and fine-tuned models would otherwise get a new ModelInfo each time)
+@lru_cache(maxsize=None)
 def get_model_info(model_name: OpenAIModelName) -> ModelInfo:
     # Check for the family of fine-tuned models.
     if model_name.startswith(FINE_TUNED_GPT4O_MINI_2024_07_18_PREFIX):
@@ -189,15 +190,20 @@ def get_model_info(model_name: OpenAIModelName) -> ModelInfo:
     return OPENAI_MODEL_INFO_BY_NAME[model_name]
 
 
-_CAPACITY_SEMAPHOR_BY_MODEL_NAME: Mapping[OpenAIModelName, asyncio.Semaphore] = defaultdict(
-    lambda: asyncio.Semaphore(20),
-)
+# used for models that do not publish a request rate limit
+_DEFAULT_RATE_LIMIT_REQ = 20.0
+
+_RATE_LIMITER_BY_MODEL_NAME: dict[OpenAIModelName, AsyncTokenBucket] = {}
 
 
-def _get_capacity_semaphor(model_name: OpenAIModelName) -> asyncio.Semaphore:
-    # Fine-tuned models share rate limits with the base model.
-    # Note: fine-tuned model prefixes fall through to the defaultdict default.
-    return _CAPACITY_SEMAPHOR_BY_MODEL_NAME[model_name]
+def _get_rate_limiter(model_name: OpenAIModelName) -> AsyncTokenBucket:
+    # Paces requests to the model's published requests-per-second limit so that bursts do not run into 429s.
+    rate_limiter = _RATE_LIMITER_BY_MODEL_NAME.get(model_name)
+    if rate_limiter is None:
+        rate_limit_req = get_model_info(model_name).rate_limit_req
+        rate_limiter = AsyncTokenBucket.build(rate_limit_req if rate_limit_req is not None else _DEFAULT_RATE_LIMIT_REQ)
+        _RATE_LIMITER_BY_MODEL_NAME[model_name] = rate_limiter
+    return rate_limiter
 
 
 def is_openai_reasoning_model(model_name: str) -> bool:
@@ -227,6 +233,22 @@ _OPENAI_COMPLETION_ERROR_PATTERN = re.compile(
 _OPENAI_STOP_REASON_TO_STOP_REASON = _OPENAI_COMPATIBLE_STOP_REASON_TO_STOP_REASON
 
 
+def _get_token_probabilities_for_entry(logprob_token_entry: ChatCompletionTokenLogprob) -> tuple[TokenProbability, ...]:
+    """The selected token followed by the other top candidates for its position."""
+    selected_token = logprob_token_entry.token
+    selected_logprob = logprob_token_entry.logprob
+    selected_entry = TokenProbability(token=selected_token, log_probability=selected_logprob, is_stop=False)
+    # compare the raw fields rather than building every candidate first and scanning for an equal model
+    return (
+        selected_entry,
+        *(
+            TokenProbability(token=top_logprob_obj.token, log_probability=top_logprob_obj.logprob, is_stop=False)
+            for top_logprob_obj in logprob_token_entry.top_logprobs
+            if top_logprob_obj.token != selected_token or top_logprob_obj.logprob != selected_logprob
+        ),
+    )
+
+
 @lru_cache(maxsize=1)
 def get_openai_tokenizer(model_name: str) -> tiktoken.Encoding:
     """Get the appropriate tiktoken tokenizer for an OpenAI model.
@@ -300,12 +322,18 @@ class OpenAIChatAPI(OpenAICompatibleAPI):
     def model_info(self) -> ModelInfo:
         return get_model_info(self.model_name)
 
-    def _get_client(self) -> AsyncOpenAI:
+    def _get_api_key(self) -> str:
         api_key = get_secret("OPENAI_API_KEY")
         if not api_key:
             raise MissingAPIKeyError("OPENAI_API_KEY environment variable is not set")
+        return api_key
+
+    def _create_client(self, api_key: str) -> AsyncOpenAI:
         return AsyncOpenAI(  # pyre-ignore[16]: pyre doesn't understand the auto-generated openai._client
-            api_key=api_key
+            api_key=api_key,
+            timeout=self._get_request_timeout(),
+            max_retries=self.sdk_max_retries,
+            http_client=self._create_http_client(),
         )
 
     async def _call_api(
@@ -329,21 +357,21 @@ class OpenAIChatAPI(OpenAICompatibleAPI):
 
             temperature: NotGiven | float = NOT_GIVEN if is_reasoning_model else params.temperature
 
-            async with _get_capacity_semaphor(self.model_name):
-                api_result = await client.chat.completions.create(
-                    model=self.model_name,
-                    messages=messages,  # type: ignore
-                    max_completion_tokens=params.max_tokens,
-                    n=params.count,
-                    temperature=temperature,
-                    stream=False,
-                    seed=params.seed,
-                    stop=params.stop,
-                    presence_penalty=self.presence_penalty,
-                    logprobs=self.is_using_logprobs,
-                    top_logprobs=top_logprobs,
-                )
-                assert isinstance(api_result, ChatCompletion)
+            await _get_rate_limiter(self.model_name).acquire()
+            api_result = await client.chat.completions.create(
+                model=self.model_name,
+                messages=messages,  # type: ignore
+                max_completion_tokens=params.max_tokens,
+                n=params.count,
+                temperature=temperature,
+                stream=False,
+                seed=params.seed,
+                stop=params.stop,
+                presence_penalty=self.presence_penalty,
+                logprobs=self.is_using_logprobs,
+                top_logprobs=top_logprobs,
+            )
+            assert isinstance(api_result, ChatCompletion)
 
             usage = api_result.usage
             if usage is not None:
@@ -403,43 +431,45 @@ class OpenAIChatAPI(OpenAICompatibleAPI):
             is_reasoning_model = is_openai_reasoning_model(self.model_name)
             temperature: NotGiven | float = NOT_GIVEN if is_reasoning_model else params.temperature
 
-            async with _get_capacity_semaphor(self.model_name):
-                api_result = await client.chat.completions.create(
-                    model=self.model_name,
-                    messages=messages,  # type: ignore
-                    max_completion_tokens=params.max_tokens,
-                    n=1,
-                    temperature=temperature,
-                    stop=params.stop,
-                    seed=params.seed,
-                    stream=True,
-                    stream_options={"include_usage": True},
-                    presence_penalty=self.presence_penalty,
-                    logprobs=False,  # not used when streaming
-                    top_logprobs=NOT_GIVEN,  # only allowed when logprobs=True
-                )
+            await _get_rate_limiter(self.model_name).acquire()
+            api_result = await client.chat.completions.create(
+                model=self.model_name,
+                messages=messages,  # type: ignore
+                max_completion_tokens=params.max_tokens,
+                n=1,
+                temperature=temperature,
+                stop=params.stop,
+                seed=params.seed,
+                stream=True,
+                stream_options={"include_usage": True},
+                presence_penalty=self.presence_penalty,
+                logprobs=False,  # not used when streaming
+                top_logprobs=NOT_GIVEN,  # only allowed when logprobs=True
+            )
             assert isinstance(api_result, AsyncStream)
 
-            yield LanguageModelStreamStartEvent()
-
-            usage = None
-            finish_reason: str | None = None
-            async for chunk in api_result:
-                if hasattr(chunk, "usage") and chunk.usage is not None:
-                    # final chunk containing usage info after all streaming is done
-                    usage = chunk.usage
-                    continue
-
-                if chunk.choices:
-                    assert len(chunk.choices) == 1, "Currently only count=1 supported for streaming API."
-                    data = only(chunk.choices)
-                    delta = data.delta.content
-                    if delta is not None:
-                        yield LanguageModelStreamDeltaEvent(delta=delta)
-                    if data.finish_reason:
-                        finish_reason = str(data.finish_reason)
-
-            stop_reason = _OPENAI_STOP_REASON_TO_STOP_REASON[str(finish_reason)]
+            # closing the stream releases the HTTP connection even if the consumer stops early or is cancelled
+            async with api_result:
+                yield LanguageModelStreamStartEvent()
+
+                usage = None
+                finish_reason: str | None = None
+                async for chunk in api_result:
+                    if hasattr(chunk, "usage") and chunk.usage is not None:
+                        # final chunk containing usage info after all streaming is done
+                        usage = chunk.usage
+                        continue
+
+                    if chunk.choices:
+                        assert len(chunk.choices) == 1, "Currently only count=1 supported for streaming API."
+                        data = only(chunk.choices)
+                        delta = data.delta.content
+                        if delta is not None:
+                            yield LanguageModelStreamDeltaEvent(delta=delta)
+                        if finish_reason is None and data.finish_reason:
+                            finish_reason = data.finish_reason
+
+            stop_reason = _OPENAI_STOP_REASON_TO_STOP_REASON.get(finish_reason, ResponseStopReason.NONE)
             # Note, OpenAI API treats end turn and stop sequence the same
             # Here we assume it is stop sequence if user has specified a stop sequence
             if params.stop is not None and stop_reason == ResponseStopReason.END_TURN:
@@ -490,7 +520,7 @@ class OpenAIChatAPI(OpenAICompatibleAPI):
             assert data.message.content is not None
             text = data.message.content
             token_count = self.count_tokens(text) + prompt_tokens
-            stop_reason = _OPENAI_STOP_REASON_TO_STOP_REASON[str(data.finish_reason)]
+            stop_reason = _OPENAI_STOP_REASON_TO_STOP_REASON.get(data.finish_reason, ResponseStopReason.NONE)
             # Note, OpenAI API treats end turn and stop sequence the same
             # Here we assume it is stop sequence if user has specified a stop sequence
             if stop is not None and stop_reason == ResponseStopReason.END_TURN:
@@ -520,46 +550,28 @@ class OpenAIChatAPI(OpenAICompatibleAPI):
             assert logprobs_content is not None
             text = data.message.content
 
-            token_probabilities = []
-            for logprob_token_entry in logprobs_content:
-                top_logprobs = logprob_token_entry.top_logprobs
-                top_entries = [
-                    TokenProbability(
-                        token=top_logprob_obj.token,
-                        log_probability=top_logprob_obj.logprob,
-                        is_stop=False,
-                    )
-                    for top_logprob_obj in top_logprobs
-                ]
-                selected_entry = TokenProbability(
-                    token=logprob_token_entry.token,
-                    log_probability=logprob_token_entry.logprob,
-                    is_stop=False,
-                )
-                if selected_entry in top_entries:
-                    top_entries.remove(selected_entry)
-                token_probabilities.append(tuple([selected_entry] + top_entries))
+            token_probabilities = tuple(
+                _get_token_probabilities_for_entry(logprob_token_entry) for logprob_token_entry in logprobs_content
+            )
 
-            stop_reason = _OPENAI_STOP_REASON_TO_STOP_REASON[str(data.finish_reason)]
+            stop_reason = _OPENAI_STOP_REASON_TO_STOP_REASON.get(data.finish_reason, ResponseStopReason.NONE)
 
             # Note, OpenAI API treats end turn and stop sequence the same
             # Here we assume it is stop sequence if user has specified a stop sequence
             if stop is not None and stop_reason == ResponseStopReason.END_TURN:
                 text += stop
-                token_probabilities.append(
-                    tuple(
-                        [
-                            TokenProbability(
-                                token=stop,
-                                log_probability=self.stop_token_log_probability,
-                                is_stop=True,
-                            )
-                        ]
-                    )
+                token_probabilities += (
+                    (
+                        TokenProbability(
+                            token=stop,
+                            log_probability=self.stop_token_log_probability,
+                            is_stop=True,
+                        ),
+                    ),
                 )
             result = LanguageModelResponseWithLogits(
                 text=text,
-                token_probabilities=tuple(token_probabilities),
+                token_probabilities=token_probabilities,
                 token_count=len(logprobs_content) + prompt_tokens,
                 stop_reason=stop_reason,
                 network_failure_count=network_failure_count,
@@ -1,12 +1,19 @@
+import asyncio
 import math
 from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any
 from typing import AsyncGenerator
+from typing import Hashable
 from typing import Iterator
+from typing import Self
 
+import attr
 import httpx
 from loguru import logger
 from openai import AsyncOpenAI
 from openai import AsyncStream
+from openai import DefaultAsyncHttpxClient
 from openai import InternalServerError
 from openai import NOT_GIVEN
 from openai import NotGiven
@@ -14,6 +21,7 @@ from openai._exceptions import APIConnectionError
 from openai._exceptions import BadRequestError
 from openai._exceptions import RateLimitError
 from openai.types.chat import ChatCompletion
+from pydantic import PrivateAttr
 
 from vet.imbue_core.agents.llm_apis.api_utils import convert_prompt_to_openai_messages
 from vet.imbue_core.agents.llm_apis.constants import approximate_token_count
@@ -33,22 +41,68 @@ from vet.imbue_core.agents.llm_apis.stream import LanguageModelStreamDeltaEvent
 from vet.imbue_core.agents.llm_apis.stream import LanguageModelStreamEndEvent
 from vet.imbue_core.agents.llm_apis.stream import LanguageModelStreamEvent
 from vet.imbue_core.agents.llm_apis.stream import LanguageModelStreamStartEvent
+from vet.imbue_core.async_monkey_patches import safe_cancel
 from vet.imbue_core.frozen_utils import FrozenDict
 from vet.imbue_core.frozen_utils import FrozenMapping
 from vet.imbue_core.itertools import only
 from vet.imbue_core.secrets_utils import get_secret
 
-_OPENAI_COMPATIBLE_STOP_REASON_TO_STOP_REASON: FrozenMapping[str, ResponseStopReason] = FrozenDict(
+# Keyed on the raw finish_reason, which is None when the provider did not report one.
+_OPENAI_COMPATIBLE_STOP_REASON_TO_STOP_REASON: FrozenMapping[str | None, ResponseStopReason] = FrozenDict(
     {
         "stop": ResponseStopReason.END_TURN,
         "length": ResponseStopReason.MAX_TOKENS,
         "tool_calls": ResponseStopReason.TOOL_CALLS,
         "function_call": ResponseStopReason.FUNCTION_CALL,
         "content_filter": ResponseStopReason.CONTENT_FILTER,
-        "None": ResponseStopReason.NONE,
+        None: ResponseStopReason.NONE,
     }
 )
 
+# The SDK default only keeps idle connections for 5 seconds, which is shorter than the gap between most agent steps,
+# so nearly every request would redo the TCP and TLS handshakes. The pool sizes are the SDK's own.
+_HTTP_CONNECTION_LIMITS = httpx.Limits(max_connections=1000, max_keepalive_connections=100, keepalive_expiry=75.0)
+
+# Identical deterministic requests that are issued while one is already running share its result instead of
+# each going over the network (e.g. when the same prompt is fanned out for self-consistency sampling).
+_IN_FLIGHT_REQUESTS: dict[Hashable, "_InFlightRequest"] = {}
+
+
+@attr.s(auto_attribs=True)
+class _InFlightRequest:
+    task: asyncio.Task[CostedLanguageModelResponse]
+    waiter_count: int = 0
+
+
+def _forget_in_flight_request(key: Hashable, in_flight_request: _InFlightRequest) -> None:
+    # a cancelled request is forgotten before it finishes, so a newer request may already be registered under the key
+    if _IN_FLIGHT_REQUESTS.get(key) is in_flight_request:
+        del _IN_FLIGHT_REQUESTS[key]
+
+
+@lru_cache(maxsize=256)
+def _convert_prompt_to_messages_cached(prompt: str) -> tuple[dict[str, str], ...]:
+    # retries resend the exact same prompt, so there is no need to parse it again
+    return tuple(convert_prompt_to_openai_messages(prompt))
+
+
+@lru_cache(maxsize=None)
+def _get_custom_model_info(model_name: str, context_window: int, max_output_tokens: int) -> ModelInfo:
+    # model_info is read several times per request, so avoid building a new pydantic model every time
+    return ModelInfo(
+        model_name=model_name,
+        cost_per_input_token=0.0,
+        cost_per_output_token=0.0,
+        max_input_tokens=context_window,
+        max_output_tokens=max_output_tokens,
+        rate_limit_req=None,
+    )
+
+
+def _get_messages(prompt: str) -> list[dict[str, str]]:
+    # copy the message dicts so that callers cannot mutate the cached entries
+    return [dict(message) for message in _convert_prompt_to_messages_cached(prompt)]
+
 
 # TODO: Should the pre-defined OpenAI model class inherit from this?
 class OpenAICompatibleAPI(LanguageModelAPI):
@@ -62,31 +116,82 @@ class OpenAICompatibleAPI(LanguageModelAPI):
     supports_temperature: bool = True
     # this shouldn't really ever even be used, but just in case
     stop_token_log_probability: float = math.log(0.9999)
+    # bounds on a single HTTP request (the defaults match the openai SDK, which fails fast on connecting but allows
+    # long generations); retries of transient errors beyond these are handled by LanguageModelAPI itself
+    request_timeout_seconds: float = 600.0
+    request_connect_timeout_seconds: float = 5.0
+    sdk_max_retries: int = 2
+
+    _cached_client: tuple[tuple[asyncio.AbstractEventLoop, str], AsyncOpenAI] | None = PrivateAttr(default=None)
 
     @property
     def model_info(self) -> ModelInfo:
         if self.context_window is None or self.max_output_tokens is None:
             raise ValueError("Must provide context_window and max_output_tokens, or subclass must override model_info")
-        return ModelInfo(
-            model_name=self.model_name,
-            cost_per_input_token=0.0,
-            cost_per_output_token=0.0,
-            max_input_tokens=self.context_window,
-            max_output_tokens=self.max_output_tokens,
-            rate_limit_req=None,
-        )
+        return _get_custom_model_info(self.model_name, self.context_window, self.max_output_tokens)
 
-    def _get_client(self) -> AsyncOpenAI:
+    def _get_api_key(self) -> str:
         api_key = get_secret(self.api_key_env) if self.api_key_env else ""
         if not api_key:
             api_key = "not-required"
             logger.debug("API key not set, attempting to use API without key.")
+        return api_key
+
+    def _get_request_timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.request_timeout_seconds, connect=self.request_connect_timeout_seconds)
+
+    def _create_http_client(self) -> httpx.AsyncClient:
+        return DefaultAsyncHttpxClient(limits=_HTTP_CONNECTION_LIMITS)
 
+    def _create_client(self, api_key: str) -> AsyncOpenAI:
         return AsyncOpenAI(
             api_key=api_key,
             base_url=self.base_url,
+            timeout=self._get_request_timeout(),
+            max_retries=self.sdk_max_retries,
+            http_client=self._create_http_client(),
         )
 
+    def _get_client(self) -> AsyncOpenAI:
+        """Return a client that is reused across calls so that its connection pool (and TLS sessions) are kept.
+
+        The underlying httpx connections belong to the event loop they were opened on, so a new client is created
+        when called from a different loop (or when the API key changes).
+        """
+        api_key = self._get_api_key()
+        client_key = (asyncio.get_running_loop(), api_key)
+        cached_client = self._cached_client
+        if cached_client is None or cached_client[0] != client_key:
+            cached_client = (client_key, self._create_client(api_key))
+            self._cached_client = cached_client
+        return cached_client[1]
+
+    async def aclose(self) -> None:
+        """Close the cached client, releasing its connections."""
+        cached_client = self._cached_client
+        self._cached_client = None
+        if cached_client is not None:
+            await cached_client[1].close()
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
+
+    def _get_common_request_kwargs(self, prompt: str, params: LanguageModelGenerationParams) -> dict[str, Any]:
+        """Arguments to `chat.completions.create` that are shared between the blocking and streaming calls."""
+        temperature: NotGiven | float = params.temperature if self.supports_temperature else NOT_GIVEN
+        return {
+            "model": self.model_name,
+            "messages": _get_messages(prompt),
+            "max_completion_tokens": params.max_tokens,
+            "temperature": temperature,
+            "seed": params.seed,
+            "stop": params.stop,
+            "presence_penalty": self.presence_penalty,
+        }
+
     @contextmanager
     def _exception_handler(self, prompt: str) -> Iterator[None]:
         try:
@@ -124,23 +229,53 @@ class OpenAICompatibleAPI(LanguageModelAPI):
         params: LanguageModelGenerationParams,
         network_failure_count: int = 0,
     ) -> CostedLanguageModelResponse:
-        messages = convert_prompt_to_openai_messages(prompt)
+        # only coalesce requests whose result does not depend on sampling
+        if params.count != 1 or params.temperature != 0 or not self.supports_temperature:
+            return await self._call_api_uncoalesced(prompt, params, network_failure_count)
+
+        loop = asyncio.get_running_loop()
+        # every field can change the request or who pays for it (e.g. api_key_env), so only identical instances share
+        key = (loop, type(self), self.model_dump_json(), prompt, params, network_failure_count)
+        in_flight_request = _IN_FLIGHT_REQUESTS.get(key)
+        if in_flight_request is None:
+            in_flight_request = _InFlightRequest(
+                task=loop.create_task(self._call_api_uncoalesced(prompt, params, network_failure_count))
+            )
+            _IN_FLIGHT_REQUESTS[key] = in_flight_request
+            in_flight_request.task.add_done_callback(lambda _: _forget_in_flight_request(key, in_flight_request))
+        else:
+            logger.trace(
+                "Coalescing request to {model_name} with an identical in-flight request", model_name=self.model_name
+            )
+
+        in_flight_request.waiter_count += 1
+        try:
+            # shield so that one waiter being cancelled does not cancel the request for the others
+            return await asyncio.shield(in_flight_request.task)
+        except asyncio.CancelledError:
+            if in_flight_request.waiter_count == 1 and not in_flight_request.task.done():
+                # the last waiter is gone, so nobody wants the result anymore
+                _forget_in_flight_request(key, in_flight_request)
+                safe_cancel(in_flight_request.task, "Every caller waiting on the coalesced request was cancelled")
+            raise
+        finally:
+            in_flight_request.waiter_count -= 1
+
+    async def _call_api_uncoalesced(
+        self,
+        prompt: str,
+        params: LanguageModelGenerationParams,
+        network_failure_count: int,
+    ) -> CostedLanguageModelResponse:
+        request_kwargs = self._get_common_request_kwargs(prompt, params)
 
         with self._exception_handler(prompt):
             client = self._get_client()
 
-            temperature: NotGiven | float = params.temperature if self.supports_temperature else NOT_GIVEN
-
             api_result = await client.chat.completions.create(
-                model=self.model_name,
-                messages=messages,
-                max_completion_tokens=params.max_tokens,
+                **request_kwargs,
                 n=params.count,
-                temperature=temperature,
                 stream=False,
-                seed=params.seed,
-                stop=params.stop,
-                presence_penalty=self.presence_penalty,
             )
             assert isinstance(api_result, ChatCompletion)
 
@@ -187,46 +322,40 @@ class OpenAICompatibleAPI(LanguageModelAPI):
         prompt: str,
         params: LanguageModelGenerationParams,
     ) -> AsyncGenerator[LanguageModelStreamEvent, None]:
-        messages = convert_prompt_to_openai_messages(prompt)
+        request_kwargs = self._get_common_request_kwargs(prompt, params)
 
         with self._exception_handler(prompt):
             client = self._get_client()
 
-            temperature: NotGiven | float = params.temperature if self.supports_temperature else NOT_GIVEN
-
             api_result = await client.chat.completions.create(
-                model=self.model_name,
-                messages=messages,
-                max_completion_tokens=params.max_tokens,
+                **request_kwargs,
                 n=1,
-                temperature=temperature,
-                stop=params.stop,
-                seed=params.seed,
                 stream=True,
                 stream_options={"include_usage": True},
-                presence_penalty=self.presence_penalty,
             )
             assert isinstance(api_result, AsyncStream)
 
-            yield LanguageModelStreamStartEvent()
-
-            usage = None
-            finish_reason: str | None = None
-            async for chunk in api_result:
-                if hasattr(chunk, "usage") and chunk.usage is not None:
-                    usage = chunk.usage
-                    continue
-
-                if chunk.choices:
-                    assert len(chunk.choices) == 1, "Currently only count=1 supported for streaming API."
-                    data = only(chunk.choices)
-                    delta = data.delta.content
-                    if delta is not None:
-                        yield LanguageModelStreamDeltaEvent(delta=delta)
-                    if data.finish_reason:
-                        finish_reason = str(data.finish_reason)
-
-            stop_reason = _OPENAI_COMPATIBLE_STOP_REASON_TO_STOP_REASON.get(str(finish_reason), ResponseStopReason.NONE)
+            # closing the stream releases the HTTP connection even if the consumer stops early or is cancelled
+            async with api_result:
+                yield LanguageModelStreamStartEvent()
+
+                usage = None
+                finish_reason: str | None = None
+                async for chunk in api_result:
+                    if hasattr(chunk, "usage") and chunk.usage is not None:
+                        usage = chunk.usage
+                        continue
+
+                    if chunk.choices:
+                        assert len(chunk.choices) == 1, "Currently only count=1 supported for streaming API."
+                        data = only(chunk.choices)
+                        delta = data.delta.content
+                        if delta is not None:
+                            yield LanguageModelStreamDeltaEvent(delta=delta)
+                        if finish_reason is None and data.finish_reason:
+                            finish_reason = data.finish_reason
+
+            stop_reason = _OPENAI_COMPATIBLE_STOP_REASON_TO_STOP_REASON.get(finish_reason, ResponseStopReason.NONE)
             if params.stop is not None and stop_reason == ResponseStopReason.END_TURN:
                 yield LanguageModelStreamDeltaEvent(delta=params.stop)
 
@@ -273,9 +402,7 @@ class OpenAICompatibleAPI(LanguageModelAPI):
             assert data.message.content is not None
             text = data.message.content
             token_count = self.count_tokens(text) + prompt_tokens
-            stop_reason = _OPENAI_COMPATIBLE_STOP_REASON_TO_STOP_REASON.get(
-                str(data.finish_reason), ResponseStopReason.NONE
-            )
+            stop_reason = _OPENAI_COMPATIBLE_STOP_REASON_TO_STOP_REASON.get(data.finish_reason, ResponseStopReason.NONE)
             if stop is not None and stop_reason == ResponseStopReason.END_TURN:
                 text += stop
             result = LanguageModelResponse(
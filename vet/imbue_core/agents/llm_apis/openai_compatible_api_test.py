@@ -0,0 +1,126 @@
+import asyncio
+
+from pydantic import PrivateAttr
+
+from vet.imbue_core.agents.llm_apis.data_types import CostedLanguageModelResponse
+from vet.imbue_core.agents.llm_apis.data_types import LanguageModelGenerationParams
+from vet.imbue_core.agents.llm_apis.data_types import LanguageModelResponse
+from vet.imbue_core.agents.llm_apis.data_types import LanguageModelResponseUsage
+from vet.imbue_core.agents.llm_apis.data_types import ResponseStopReason
+from vet.imbue_core.agents.llm_apis.openai_compatible_api import OpenAICompatibleAPI
+
+_DETERMINISTIC_PARAMS = LanguageModelGenerationParams(temperature=0.0)
+
+
+class _SlowFakeAPI(OpenAICompatibleAPI):
+    """Stands in for the network with a slow request that records how often it was started and how it ended."""
+
+    request_seconds: float = 0.05
+    # private, so that they are not part of the fields the coalescing key is built from
+    _started_count: int = PrivateAttr(default=0)
+    _finished_count: int = PrivateAttr(default=0)
+    _cancelled_count: int = PrivateAttr(default=0)
+
+    async def _call_api_uncoalesced(
+        self,
+        prompt: str,
+        params: LanguageModelGenerationParams,
+        network_failure_count: int,
+    ) -> CostedLanguageModelResponse:
+        self._started_count += 1
+        try:
+            await asyncio.sleep(self.request_seconds)
+        except asyncio.CancelledError:
+            self._cancelled_count += 1
+            raise
+        self._finished_count += 1
+        return CostedLanguageModelResponse(
+            usage=LanguageModelResponseUsage(prompt_tokens_used=1, completion_tokens_used=1, dollars_used=0.0),
+            responses=(
+                LanguageModelResponse(
+                    text=prompt.upper(),
+                    token_count=1,
+                    stop_reason=ResponseStopReason.END_TURN,
+                    network_failure_count=network_failure_count,
+                ),
+            ),
+        )
+
+
+def _build_api() -> _SlowFakeAPI:
+    return _SlowFakeAPI(model_name="fake-model", cache_path=None, context_window=1000, max_output_tokens=100)
+
+
+def test_identical_deterministic_requests_are_coalesced() -> None:
+    async def run() -> tuple[_SlowFakeAPI, list[CostedLanguageModelResponse]]:
+        api = _build_api()
+        responses = await asyncio.gather(
+            *[api._call_api("[ROLE=USER]\nsame", _DETERMINISTIC_PARAMS) for _ in range(5)],
+            api._call_api("[ROLE=USER]\nother", _DETERMINISTIC_PARAMS),
+        )
+        return api, responses
+
+    api, responses = asyncio.run(run())
+    assert api._started_count == 2
+    assert [response.responses[0].text for response in responses] == ["[ROLE=USER]\nSAME"] * 5 + ["[ROLE=USER]\nOTHER"]
+
+
+def test_sampled_requests_are_not_coalesced() -> None:
+    async def run() -> _SlowFakeAPI:
+        api = _build_api()
+        params = LanguageModelGenerationParams(temperature=0.7)
+        await asyncio.gather(*[api._call_api("[ROLE=USER]\nsame", params) for _ in range(3)])
+        return api
+
+    assert asyncio.run(run())._started_count == 3
+
+
+def test_cancelling_the_only_waiter_cancels_the_request() -> None:
+    async def run() -> _SlowFakeAPI:
+        api = _build_api()
+        try:
+            await asyncio.wait_for(api._call_api("[ROLE=USER]\nsame", _DETERMINISTIC_PARAMS), 0.01)
+        except TimeoutError:
+            pass
+        await asyncio.sleep(api.request_seconds)
+        return api
+
+    api = asyncio.run(run())
+    assert api._cancelled_count == 1
+    assert api._finished_count == 0
+
+
+def test_cancelling_one_of_several_waiters_keeps_the_request_running() -> None:
+    async def run() -> tuple[_SlowFakeAPI, CostedLanguageModelResponse]:
+        api = _build_api()
+        cancelled_waiter = asyncio.create_task(api._call_api("[ROLE=USER]\nsame", _DETERMINISTIC_PARAMS))
+        other_waiter = asyncio.create_task(api._call_api("[ROLE=USER]\nsame", _DETERMINISTIC_PARAMS))
+        await asyncio.sleep(0.01)
+        cancelled_waiter.cancel()
+        return api, await other_waiter
+
+    api, response = asyncio.run(run())
+    assert api._started_count == 1
+    assert api._cancelled_count == 0
+    assert response.responses[0].text == "[ROLE=USER]\nSAME"
+
+
+def test_requests_from_differently_configured_instances_are_not_coalesced() -> None:
+    async def run() -> tuple[_SlowFakeAPI, _SlowFakeAPI]:
+        api = _build_api()
+        other_api = _SlowFakeAPI(
+            model_name="fake-model",
+            cache_path=None,
+            context_window=1000,
+            max_output_tokens=100,
+            api_key_env="OTHER_API_KEY",
+        )
+        await asyncio.gather(
+            api._call_api("[ROLE=USER]\nsame", _DETERMINISTIC_PARAMS),
+            other_api._call_api("[ROLE=USER]\nsame", _DETERMINISTIC_PARAMS),
+        )
+        return api, other_api
+
+    api, other_api = asyncio.run(run())
+    assert api._started_count == 1
+    assert other_api._started_count == 1
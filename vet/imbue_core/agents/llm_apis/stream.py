@@ -17,6 +17,8 @@ from vet.imbue_core.agents.llm_apis.data_types import ModelResponse
 from vet.imbue_core.agents.llm_apis.data_types import ResponseStopReason
 from vet.imbue_core.agents.primitives.resource_limits import PaymentAuthorization
 from vet.imbue_core.agents.primitives.resource_limits import get_global_resource_limits
+from vet.imbue_core.async_monkey_patches import safe_cancel
+from vet.imbue_core.async_monkey_patches import safe_cancel_and_wait_for_cleanup
 from vet.imbue_core.caching import AsyncCache
 from vet.imbue_core.pydantic_serialization import SerializableModel
 
@@ -38,6 +40,10 @@ class LanguageModelStreamEndEvent(SerializableModel):
 
 LanguageModelStreamEvent = LanguageModelStreamStartEvent | LanguageModelStreamDeltaEvent | LanguageModelStreamEndEvent
 
+# how far the pump may read ahead of a reader before waiting for it, so that a reader that stops early (e.g. by
+# breaking out of its loop) also stops the API stream instead of buffering the rest of it
+_MAX_BUFFERED_ITEMS_PER_READER = 8
+
 
 class LanguageModelStreamCallback(abc.ABC, SerializableModel):
     @abc.abstractmethod
@@ -93,6 +99,10 @@ async def get_cached_response_stream(
     yield LanguageModelStreamEndEvent(usage=response.usage, stop_reason=response.responses[0].stop_reason)
 
 
+async def _single_item_stream(item: str) -> AsyncIterator[str]:
+    yield item
+
+
 class StreamedLanguageModelResponse(ModelResponse):
     """A stream of LanguageModel API events."""
 
@@ -105,8 +115,14 @@ class StreamedLanguageModelResponse(ModelResponse):
         network_failure_count: int,
         completion_callbacks: Sequence[LanguageModelStreamCallback] = (),
     ) -> None:
-        # the underlying stream coming from the API
+        # the underlying stream coming from the API, which is read by a single pump task started on first use
         self._event_stream = event_stream
+        self._pump: asyncio.Task[None] | None = None
+        self._pump_error: Exception | None = None
+        self._is_pump_finished = asyncio.Event()
+        # each active reader gets its own queue, mapped to whether it wants text deltas rather than events
+        self._reader_queues: dict[asyncio.Queue[Any], bool] = {}
+        self._reader_count = 0
         self.text_stream = self._stream_text()
         self._final_message_snapshot: LanguageModelResponse | None = None
 
@@ -115,46 +131,139 @@ class StreamedLanguageModelResponse(ModelResponse):
         self._network_failure_count = network_failure_count
         self.stop_reason: ResponseStopReason | None = None
 
+    @classmethod
+    def from_cached(cls, response: CostedLanguageModelResponse) -> "StreamedLanguageModelResponse":
+        """Wrap a response that is already known in full (i.e. a cache hit).
+
+        The final message and text are available immediately, so get_final_message and text_stream do not need to go
+        through the event stream at all. Iterating over the response still replays the start/delta/end events.
+        """
+        first_response = response.responses[0]
+        streamed_response = cls(get_cached_response_stream(response), network_failure_count=0)
+        streamed_response.stop_reason = first_response.stop_reason
+        streamed_response._final_message_snapshot = LanguageModelResponse(
+            text=first_response.text,
+            token_count=response.usage.completion_tokens_used,
+            stop_reason=first_response.stop_reason,
+            network_failure_count=0,
+        )
+        streamed_response.text_stream = _single_item_stream(first_response.text)
+        return streamed_response
+
     async def get_final_message(self) -> LanguageModelResponse:
-        # wait until final message
-        await consume_async_iterator(self._event_stream)
+        if self._final_message_snapshot is not None:
+            return self._final_message_snapshot
+        if not self._is_pump_finished.is_set():
+            self._add_reader()
+            try:
+                # waiting on the event rather than the pump, so a cancelled waiter only stops the pump if it was the last reader
+                await self._is_pump_finished.wait()
+            finally:
+                self._remove_reader(is_finished=self._is_pump_finished.is_set())
+        if self._pump_error is not None:
+            raise self._pump_error
         assert self._final_message_snapshot is not None
         return self._final_message_snapshot
 
-    async def __aiter__(self) -> AsyncGenerator[LanguageModelStreamEvent, None]:
-        # iterator of events, with handling of shutdown
-        async with aclosing(self._event_stream) as event_stream:
-            deltas: list[str] = []
-            async for event in event_stream:
-                if isinstance(event, LanguageModelStreamStartEvent):
-                    # Need nested if statement here for outer if-elif-else to correctly filter for unknown event types
-                    if len(deltas) > 0 or self._final_message_snapshot is not None:
-                        raise RuntimeError("Start event should be the first event in stream.")
-                elif isinstance(event, LanguageModelStreamDeltaEvent):
-                    deltas.append(event.delta)
-                elif isinstance(event, LanguageModelStreamEndEvent):
-                    self.stop_reason = event.stop_reason
-                    self._final_message_snapshot = LanguageModelResponse(
-                        text="".join(deltas),
-                        token_count=(0 if event.usage is None else event.usage.completion_tokens_used),
-                        stop_reason=event.stop_reason,
-                        network_failure_count=self._network_failure_count,
-                    )
-                    if self._completion_callbacks is not None:
-                        costed_response = CostedLanguageModelResponse(
-                            usage=event.usage, responses=(self._final_message_snapshot,)
+    def _add_reader(self) -> None:
+        self._reader_count += 1
+        if self._pump is None:
+            self._pump = asyncio.create_task(self._pump_events())
+
+    def _remove_reader(self, is_finished: bool) -> None:
+        self._reader_count -= 1
+        # nobody is left to read the rest of the stream, so stop paying for it
+        if self._reader_count == 0 and not is_finished and self._pump is not None and not self._pump.done():
+            safe_cancel(self._pump, "Every reader of the StreamedLanguageModelResponse went away")
+
+    async def _pump_events(self) -> None:
+        """Single consumer of the underlying stream, fanning events and text deltas out to the active readers."""
+        try:
+            async with aclosing(self._event_stream) as event_stream:
+                deltas: list[str] = []
+                is_ended = False
+                async for event in event_stream:
+                    if isinstance(event, LanguageModelStreamStartEvent):
+                        # Need nested if statement here for outer if-elif-else to correctly filter for unknown event types
+                        if len(deltas) > 0 or is_ended:
+                            raise RuntimeError("Start event should be the first event in stream.")
+                    elif isinstance(event, LanguageModelStreamDeltaEvent):
+                        deltas.append(event.delta)
+                    elif isinstance(event, LanguageModelStreamEndEvent):
+                        is_ended = True
+                        self.stop_reason = event.stop_reason
+                        self._final_message_snapshot = LanguageModelResponse(
+                            text="".join(deltas),
+                            token_count=(0 if event.usage is None else event.usage.completion_tokens_used),
+                            stop_reason=event.stop_reason,
+                            network_failure_count=self._network_failure_count,
                         )
-                        await asyncio.gather(*[callback(costed_response) for callback in self._completion_callbacks])
-                else:
-                    raise ValueError(f"Unknown or Unexpected StreamEvent type {type(event)}.")
-
-                yield event
-
-    async def _stream_text(self) -> AsyncIterator[str]:
-        # iterator of text delta
-        async for event in self:
-            if isinstance(event, LanguageModelStreamDeltaEvent):
-                yield event.delta
+                        # only wrap the snapshot when someone is going to receive it
+                        if self._completion_callbacks:
+                            costed_response = CostedLanguageModelResponse(
+                                usage=event.usage, responses=(self._final_message_snapshot,)
+                            )
+                            await asyncio.gather(
+                                *[callback(costed_response) for callback in self._completion_callbacks]
+                            )
+                    else:
+                        raise ValueError(f"Unknown or Unexpected StreamEvent type {type(event)}.")
+
+                    for queue, is_text_reader in tuple(self._reader_queues.items()):
+                        if not is_text_reader:
+                            queue.put_nowait(event)
+                        elif isinstance(event, LanguageModelStreamDeltaEvent):
+                            queue.put_nowait(event.delta)
+                    # don't read further ahead of the slowest reader than we have to
+                    for queue in tuple(self._reader_queues):
+                        if queue.qsize() >= _MAX_BUFFERED_ITEMS_PER_READER:
+                            await queue.join()
+        except asyncio.CancelledError:
+            self._pump_error = RuntimeError("StreamedLanguageModelResponse was closed before the stream ended")
+            raise
+        except Exception as e:
+            # re-raised by every reader rather than from the pump task itself
+            self._pump_error = e
+        finally:
+            self._is_pump_finished.set()
+            for queue in self._reader_queues:
+                queue.put_nowait(None)
+
+    async def _drain(self, is_text_reader: bool) -> AsyncGenerator[Any, None]:
+        if self._is_pump_finished.is_set():
+            # everything was already read by someone else (or the stream was closed)
+            if self._pump_error is not None:
+                raise self._pump_error
+            return
+        queue: asyncio.Queue[Any] = asyncio.Queue()
+        self._reader_queues[queue] = is_text_reader
+        self._add_reader()
+        is_finished = False
+        try:
+            while True:
+                item = await queue.get()
+                queue.task_done()
+                if item is None:
+                    is_finished = True
+                    if self._pump_error is not None:
+                        raise self._pump_error
+                    return
+                yield item
+        finally:
+            del self._reader_queues[queue]
+            # release the pump if it is waiting for this reader to catch up
+            while not queue.empty():
+                queue.get_nowait()
+                queue.task_done()
+            self._remove_reader(is_finished)
+
+    def __aiter__(self) -> AsyncGenerator[LanguageModelStreamEvent, None]:
+        # iterator of events, starting from the point where iteration begins
+        return self._drain(is_text_reader=False)
+
+    def _stream_text(self) -> AsyncGenerator[str, None]:
+        # iterator of text delta, starting from the point where iteration begins
+        return self._drain(is_text_reader=True)
 
     async def __aenter__(self) -> "StreamedLanguageModelResponse":
         return self
@@ -163,6 +272,12 @@ class StreamedLanguageModelResponse(ModelResponse):
         await self.aclose()
 
     async def aclose(self) -> None:
-        """Close iterator."""
-        # clean up underlying stream (currently not sure how to do this/if we need to do this)
+        """Stop reading from the API and close the underlying stream."""
+        if self._pump is not None and not self._pump.done():
+            await safe_cancel_and_wait_for_cleanup(self._pump, "StreamedLanguageModelResponse was closed")
+        elif self._pump is None and not self._is_pump_finished.is_set():
+            # nothing was read yet, so make any later reader fail instead of waiting on a pump that never starts
+            self._pump_error = RuntimeError("StreamedLanguageModelResponse was closed before the stream ended")
+            self._is_pump_finished.set()
+        # the pump closes the stream itself, but it may never have been started
         await self._event_stream.aclose()
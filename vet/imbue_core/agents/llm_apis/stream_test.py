@@ -0,0 +1,198 @@
+import asyncio
+from typing import AsyncGenerator
+
+import pytest
+
+from vet.imbue_core.agents.llm_apis.data_types import CostedLanguageModelResponse
+from vet.imbue_core.agents.llm_apis.data_types import LanguageModelResponse
+from vet.imbue_core.agents.llm_apis.data_types import LanguageModelResponseUsage
+from vet.imbue_core.agents.llm_apis.data_types import ResponseStopReason
+from vet.imbue_core.agents.llm_apis.stream import LanguageModelStreamDeltaEvent
+from vet.imbue_core.agents.llm_apis.stream import LanguageModelStreamEndEvent
+from vet.imbue_core.agents.llm_apis.stream import LanguageModelStreamEvent
+from vet.imbue_core.agents.llm_apis.stream import LanguageModelStreamStartEvent
+from vet.imbue_core.agents.llm_apis.stream import StreamedLanguageModelResponse
+
+_USAGE = LanguageModelResponseUsage(prompt_tokens_used=3, completion_tokens_used=5, dollars_used=0.0)
+
+
+class _FakeApiStream:
+    """Yields a start event, `delta_count` deltas and an end event, recording how far it was read."""
+
+    def __init__(self, delta_count: int, error_after: int | None = None, delay_seconds: float = 0.0) -> None:
+        self.delta_count = delta_count
+        self.error_after = error_after
+        self.delay_seconds = delay_seconds
+        self.deltas_read = 0
+        self.is_closed = False
+
+    async def events(self) -> AsyncGenerator[LanguageModelStreamEvent, None]:
+        try:
+            yield LanguageModelStreamStartEvent()
+            for i in range(self.delta_count):
+                if i == self.error_after:
+                    raise ValueError("api went away")
+                await asyncio.sleep(self.delay_seconds)
+                self.deltas_read += 1
+                yield LanguageModelStreamDeltaEvent(delta=str(i))
+            yield LanguageModelStreamEndEvent(usage=_USAGE, stop_reason=ResponseStopReason.END_TURN)
+        finally:
+            self.is_closed = True
+
+
+def test_text_stream_and_final_message() -> None:
+    async def run() -> tuple[list[str], LanguageModelResponse]:
+        response = StreamedLanguageModelResponse(_FakeApiStream(delta_count=3).events(), network_failure_count=1)
+        texts = [text async for text in response.text_stream]
+        return texts, await response.get_final_message()
+
+    texts, final_message = asyncio.run(run())
+    assert texts == ["0", "1", "2"]
+    assert final_message.text == "012"
+    assert final_message.token_count == 5
+    assert final_message.stop_reason == ResponseStopReason.END_TURN
+    assert final_message.network_failure_count == 1
+
+
+def test_events_and_text_can_be_read_concurrently() -> None:
+    async def run() -> tuple[list[LanguageModelStreamEvent], list[str]]:
+        response = StreamedLanguageModelResponse(_FakeApiStream(delta_count=20).events(), network_failure_count=0)
+
+        async def read_events() -> list[LanguageModelStreamEvent]:
+            return [event async for event in response]
+
+        async def read_text() -> list[str]:
+            return [text async for text in response.text_stream]
+
+        return await asyncio.gather(read_events(), read_text())
+
+    events, texts = asyncio.run(run())
+    assert len(events) == 22
+    assert isinstance(events[0], LanguageModelStreamStartEvent)
+    assert isinstance(events[-1], LanguageModelStreamEndEvent)
+    assert texts == [str(i) for i in range(20)]
+
+
+def test_api_error_is_raised_to_every_reader() -> None:
+    async def run() -> None:
+        api_stream = _FakeApiStream(delta_count=5, error_after=2)
+        response = StreamedLanguageModelResponse(api_stream.events(), network_failure_count=0)
+        with pytest.raises(ValueError, match="api went away"):
+            async for _ in response.text_stream:
+                pass
+        with pytest.raises(ValueError, match="api went away"):
+            await response.get_final_message()
+        assert api_stream.is_closed
+
+    asyncio.run(run())
+
+
+def test_cancelling_the_only_reader_closes_the_api_stream() -> None:
+    async def run() -> None:
+        api_stream = _FakeApiStream(delta_count=30, delay_seconds=0.01)
+        response = StreamedLanguageModelResponse(api_stream.events(), network_failure_count=0)
+        texts: list[str] = []
+
+        async def read_text() -> None:
+            async for text in response.text_stream:
+                texts.append(text)
+
+        reader = asyncio.create_task(read_text())
+        while len(texts) < 3:
+            await asyncio.sleep(0.001)
+        reader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await reader
+        await asyncio.sleep(0.05)
+
+        assert api_stream.is_closed
+        assert api_stream.deltas_read < 30
+        with pytest.raises(RuntimeError, match="closed"):
+            await response.get_final_message()
+
+    asyncio.run(run())
+
+
+def test_cancelling_one_final_message_waiter_does_not_cut_the_stream_short_for_others() -> None:
+    async def run() -> None:
+        response = StreamedLanguageModelResponse(
+            _FakeApiStream(delta_count=10, delay_seconds=0.001).events(), network_failure_count=0
+        )
+        cancelled_waiter = asyncio.create_task(response.get_final_message())
+        other_waiter = asyncio.create_task(response.get_final_message())
+        await asyncio.sleep(0.002)
+        cancelled_waiter.cancel()
+        assert (await other_waiter).text == "".join(str(i) for i in range(10))
+
+    asyncio.run(run())
+
+
+def test_breaking_out_early_stops_reading_the_api_stream() -> None:
+    async def run() -> None:
+        api_stream = _FakeApiStream(delta_count=30)
+        response = StreamedLanguageModelResponse(api_stream.events(), network_failure_count=0)
+        async for _ in response.text_stream:
+            break
+        await asyncio.sleep(0.01)
+        assert api_stream.deltas_read < 30
+        await response.aclose()
+        assert api_stream.is_closed
+
+    asyncio.run(run())
+
+
+def test_get_final_message_after_aclose_raises_runtime_error() -> None:
+    async def run() -> None:
+        api_stream = _FakeApiStream(delta_count=30, delay_seconds=0.01)
+        response = StreamedLanguageModelResponse(api_stream.events(), network_failure_count=0)
+        async for _ in response.text_stream:
+            break
+        await response.aclose()
+        assert api_stream.is_closed
+        with pytest.raises(RuntimeError, match="closed"):
+            await response.get_final_message()
+
+    asyncio.run(run())
+
+
+def test_aclose_before_reading() -> None:
+    async def run() -> None:
+        response = StreamedLanguageModelResponse(_FakeApiStream(delta_count=3).events(), network_failure_count=0)
+        await response.aclose()
+        with pytest.raises(RuntimeError, match="closed"):
+            await response.get_final_message()
+        with pytest.raises(RuntimeError, match="closed"):
+            async for _ in response.text_stream:
+                pass
+
+    asyncio.run(run())
+
+
+def test_from_cached() -> None:
+    cached_response = CostedLanguageModelResponse(
+        usage=_USAGE,
+        responses=(
+            LanguageModelResponse(
+                text="cached", token_count=5, stop_reason=ResponseStopReason.MAX_TOKENS, network_failure_count=2
+            ),
+        ),
+    )
+
+    async def run() -> tuple[LanguageModelResponse, list[str], list[LanguageModelStreamEvent]]:
+        response = StreamedLanguageModelResponse.from_cached(cached_response)
+        final_message = await response.get_final_message()
+        texts = [text async for text in response.text_stream]
+        events = [event async for event in response]
+        return final_message, texts, events
+
+    final_message, texts, events = asyncio.run(run())
+    assert final_message.text == "cached"
+    assert final_message.token_count == 5
+    assert final_message.stop_reason == ResponseStopReason.MAX_TOKENS
+    assert final_message.network_failure_count == 0
+    assert texts == ["cached"]
+    assert [type(event) for event in events] == [
+        LanguageModelStreamStartEvent,
+        LanguageModelStreamDeltaEvent,
+        LanguageModelStreamEndEvent,
+    ]
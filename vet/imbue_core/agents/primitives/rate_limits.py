@@ -0,0 +1,38 @@
+import asyncio
+import time
+
+import attr
+
+
+@attr.s(auto_attribs=True)
+class AsyncTokenBucket:
+    """Limits how often something can happen (e.g. requests per second) rather than how many can be in flight at once.
+
+    Up to `capacity` tokens can be taken in a burst, after which tokens become available again at
+    `refill_per_second`. Waiters are served in order, since the lock is held while sleeping.
+    """
+
+    capacity: float
+    refill_per_second: float
+    tokens: float
+    last_refill_at: float = attr.ib(factory=time.monotonic)
+    lock: asyncio.Lock = attr.ib(factory=asyncio.Lock)
+
+    @classmethod
+    def build(cls, rate_per_second: float) -> "AsyncTokenBucket":
+        assert rate_per_second > 0, "rate_per_second must be positive"
+        return cls(capacity=rate_per_second, refill_per_second=rate_per_second, tokens=rate_per_second)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill_at) * self.refill_per_second)
+        self.last_refill_at = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        assert tokens <= self.capacity, f"Cannot acquire {tokens} tokens from a bucket of capacity {self.capacity}"
+        async with self.lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.refill_per_second)
+                self._refill()
+            self.tokens -= tokens
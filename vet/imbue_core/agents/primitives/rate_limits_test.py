@@ -0,0 +1,25 @@
+import asyncio
+import time
+
+from vet.imbue_core.agents.primitives.rate_limits import AsyncTokenBucket
+
+
+def test_token_bucket_allows_burst_up_to_capacity() -> None:
+    async def acquire_all() -> float:
+        bucket = AsyncTokenBucket.build(rate_per_second=5)
+        started_at = time.monotonic()
+        await asyncio.gather(*[bucket.acquire() for _ in range(5)])
+        return time.monotonic() - started_at
+
+    assert asyncio.run(acquire_all()) < 0.1
+
+
+def test_token_bucket_paces_requests_beyond_capacity() -> None:
+    async def acquire_all() -> float:
+        bucket = AsyncTokenBucket.build(rate_per_second=20)
+        started_at = time.monotonic()
+        await asyncio.gather(*[bucket.acquire() for _ in range(30)])
+        return time.monotonic() - started_at
+
+    # the first 20 are taken immediately, the remaining 10 refill at 20 per second
+    assert asyncio.run(acquire_all()) >= 0.45
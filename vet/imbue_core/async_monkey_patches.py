@@ -1,7 +1,9 @@
 import asyncio
+import os
 import sys
 import traceback
 from asyncio import Future
+from types import FrameType
 from types import TracebackType
 from typing import Any
 from typing import Sequence
@@ -12,6 +14,12 @@ from vet.imbue_core.errors import ExpectedError
 
 _IS_SHUTTING_DOWN = False
 
+# PropagatingTaskGroup reimplements TaskGroup internals, which differ between Python versions
+_IS_PYTHON_VERSION_SUPPORTED = sys.version_info[:2] in ((3, 11), (3, 12))
+
+# how many of the innermost frames are included when recording why a task (or task group) was canceled
+_CANCEL_STACK_DEPTH = int(os.getenv("IMBUE_CANCEL_STACK_DEPTH", "50"))
+
 
 def notify_task_groups_of_shutdown() -> None:
     global _IS_SHUTTING_DOWN
@@ -22,13 +30,9 @@ class PropagatingTaskGroup(asyncio.TaskGroup):
     """Improves over TaskGroup by ensuring that cancelation messages are actually propagated"""
 
     def __init__(self) -> None:
-        # deferring the import in case this doesn't get used
-        pass
-
-        python_version: sys._version_info = sys.version_info
-        if python_version[:2] != (3, 11) and python_version[:2] != (3, 12):
+        if not _IS_PYTHON_VERSION_SUPPORTED:
             raise RuntimeError(
-                f"Python version 3.11 or 3.12 is required. You are using {python_version.major}.{python_version.minor}"
+                f"Python version 3.11 or 3.12 is required. You are using {sys.version_info.major}.{sys.version_info.minor}"
             )
         super().__init__()
         self._entered = False
@@ -159,7 +163,7 @@ class PropagatingTaskGroup(asyncio.TaskGroup):
 
         if self._original_message is None:
             if isinstance(exc, asyncio.exceptions.CancelledError) and len(exc.args) > 0:
-                self._original_message = "TaskGroup canceled because:\n" + exc.args[0]
+                self._original_message = "TaskGroup canceled because:\n" + str(exc.args[0])
             else:
                 if not isinstance(exc, asyncio.exceptions.CancelledError):
                     if not _IS_SHUTTING_DOWN and not isinstance(exc, ExpectedError):
@@ -168,7 +172,7 @@ class PropagatingTaskGroup(asyncio.TaskGroup):
                             "Emergency print of error that caused task group to die:",
                         )
                 self._original_message = f"TaskGroup died because: {type(exc).__name__}: {exc}\n" + "".join(
-                    traceback.extract_tb(exc.__traceback__).format()
+                    traceback.format_tb(exc.__traceback__, limit=-_CANCEL_STACK_DEPTH)
                 )
 
         for t in self._tasks:
@@ -233,6 +237,41 @@ class PropagatingTaskGroup(asyncio.TaskGroup):
             parent_task.cancel(self._original_message)
 
 
+class _LazyCancelMessage:
+    """A cancellation message that only formats the canceling stack if somebody actually reads it.
+
+    Most cancellations (e.g. during shutdown) are never inspected, so only the (unformatted) frame summaries are
+    captured up front. No frames are kept alive, since that would also keep all of their locals alive.
+    """
+
+    __slots__ = ("_stack", "_msg", "_rendered")
+
+    def __init__(self, stack: traceback.StackSummary, msg: str | None) -> None:
+        self._stack = stack
+        self._msg = msg
+        self._rendered: str | None = None
+
+    @classmethod
+    def capture(cls, frame: FrameType, msg: str | None) -> "_LazyCancelMessage":
+        """Record the stack up to and including `frame`, without looking up any source lines yet."""
+        stack = traceback.StackSummary.extract(
+            traceback.walk_stack(frame), limit=_CANCEL_STACK_DEPTH, lookup_lines=False
+        )
+        stack.reverse()
+        return cls(stack, msg)
+
+    def __str__(self) -> str:
+        if self._rendered is None:
+            message = f"Task canceled by: \n {''.join(self._stack.format())}"
+            if self._msg:
+                message += f"\nOriginal message: {self._msg}"
+            self._rendered = message
+        return self._rendered
+
+    def __repr__(self) -> str:
+        return repr(str(self))
+
+
 def safe_cancel(task: asyncio.Task, msg: str | None = None) -> None:
     """
     NOTE: this is probably not what you want!  See safe_cancel_and_wait_for_cleanup below for the more common use case.
@@ -250,12 +289,13 @@ def safe_cancel(task: asyncio.Task, msg: str | None = None) -> None:
     Note also that cancellation is never guaranteed -- all it does is raise a CancelledError in the task.
     This is why it is so important to never swallow those errors!
     """
-    task.is_being_canceled_by_us = True  # type: ignore
-    message = f"Task canceled by: \n {''.join(traceback.format_stack()[:-1])}"
-    if msg:
-        message += f"\nOriginal message: {msg}"
+    # skip this frame, since it is the same for every cancellation
+    _cancel_with_message(task, _LazyCancelMessage.capture(sys._getframe(1), msg))
+
 
-    task.cancel(message)
+def _cancel_with_message(task: asyncio.Task, message: _LazyCancelMessage) -> None:
+    task.is_being_canceled_by_us = True  # type: ignore
+    task.cancel(message)  # type: ignore[arg-type]
 
 
 async def safe_cancel_and_wait_for_cleanup(
@@ -285,46 +325,48 @@ async def safe_cancel_multiple_and_wait_for_cleanup(
 
     We cannot simply suppress all BaseExceptions here because you really don't want to do that for things like signals and OutOfMemoryError
     """
+    # all of the tasks are canceled from the same place, so they can share one message (and only render it once)
+    message = _LazyCancelMessage.capture(sys._getframe(), msg)
     for task in tasks:
-        safe_cancel(task, msg)
+        _cancel_with_message(task, message)
     # if you really want something to be canceled, you need to wait for it to be done
     # https://docs.python.org/3/library/asyncio-task.html#asyncio.Task.cancel
     results = await asyncio.gather(*tasks, return_exceptions=True)
-    exceptions = []
-    for result in results:
-        if isinstance(result, BaseException):
-            if isinstance(result, asyncio.CancelledError):
-                pass
-            elif isinstance(result, ExceptionGroup):
-                exceptions.extend(_filter_exception_group(result))
-            else:
-                exceptions.append(result)  # type: ignore
-        # cannot do this because the task may have just finished
-        # assert (
-        #     False
-        # ), f"While cancelling async task and waiting for cleanup, expected None or CancelledError, got `{type(x)}: {x}`"
-
+    # a single isinstance call against a tuple checks all of the types at once
+    exception_types_to_ignore_tuple = tuple(exception_types_to_ignore)
     filtered_exceptions = []
-    for exception in exceptions:
-        if not any(isinstance(exception, exception_type) for exception_type in exception_types_to_ignore):
-            filtered_exceptions.append(exception)
+    for result in results:
+        # cannot assert that the result is None or a CancelledError because the task may have just finished
+        if not isinstance(result, BaseException) or isinstance(result, asyncio.CancelledError):
+            continue
+        exceptions = _filter_exception_group(result) if isinstance(result, BaseExceptionGroup) else (result,)
+        for exception in exceptions:
+            if not isinstance(exception, exception_types_to_ignore_tuple):
+                filtered_exceptions.append(exception)
 
     if len(filtered_exceptions) == 1:
         raise filtered_exceptions[0]
     elif len(filtered_exceptions) > 1:
-        raise ExceptionGroup("Multiple exceptions in task group while canceling", filtered_exceptions)
-
-
-def _filter_exception_group(exc_group: ExceptionGroup) -> list[Exception]:
-    """Recursively extract exceptions from ExceptionGroups (ignoring canceled errors)."""
-    result = []
-    for exc in exc_group.exceptions:
-        if isinstance(exc, asyncio.CancelledError):
-            continue
-        elif isinstance(exc, ExceptionGroup):
-            result.extend(_filter_exception_group(exc))
+        # this is an ExceptionGroup unless one of the exceptions is a bare BaseException
+        raise BaseExceptionGroup("Multiple exceptions in task group while canceling", filtered_exceptions)
+
+
+def _filter_exception_group(exc_group: BaseExceptionGroup) -> list[BaseException]:
+    """Extract exceptions from (arbitrarily nested) exception groups, in order, ignoring canceled errors."""
+    result: list[BaseException] = []
+    # a stack of partially consumed groups rather than recursion, so deep nesting can't hit the recursion limit
+    pending = [iter(exc_group.exceptions)]
+    while pending:
+        for exc in pending[-1]:
+            if isinstance(exc, asyncio.CancelledError):
+                continue
+            elif isinstance(exc, BaseExceptionGroup):
+                pending.append(iter(exc.exceptions))
+                break
+            else:
+                result.append(exc)
         else:
-            result.append(exc)
+            pending.pop()
     return result
 
 
@@ -1,4 +1,4 @@
-import sys
+import asyncio
 from contextlib import contextmanager
 from contextvars import ContextVar
 from typing import Any
@@ -9,6 +9,8 @@ from typing import Iterator
 import pytest
 from loguru import logger
 
+from vet.imbue_core.async_monkey_patches import _filter_exception_group
+
 
 class IncorrectErrorsLoggedDuringTesting(Exception):
     pass
@@ -33,22 +35,14 @@ def check_logged_errors(check_func: Callable[[list[str]], None]) -> Iterator[Non
         record = message.record
         if record["level"].name == "ERROR":
             accumulated_errors.append(record["message"])
-            sys.stderr.write(f"CAUGHT ERROR LOG: {record['message'].splitlines()[0][:100]}\n")
-        else:
-            sys.stderr.write(str(message))
-
-    handler_id = logger.add(error_catching_sink, format="{message}", level="DEBUG")
-    try:
-        logger.remove(0)
-    except ValueError:
-        pass
 
+    # only ERROR and above reach the sink; everything else keeps going to the existing handlers untouched
+    handler_id = logger.add(error_catching_sink, format="{message}", level="ERROR")
     try:
         yield
     finally:
         _expecting_errors.reset(token)
         logger.remove(handler_id)
-        logger.add(sys.stderr, level="DEBUG")
         check_func(accumulated_errors)
 
 
@@ -114,21 +108,10 @@ def explode_on_error() -> Generator[None, None, None]:
 
     def error_catching_sink(message: Any) -> None:
         record = message.record
-        if record["level"].name == "ERROR":
-            if not _expecting_errors.get():
-                accumulated_errors.append(record["message"])
-        sys.stderr.write(str(message))
-
-    handler_id = logger.add(
-        error_catching_sink,
-        format="{level} | {name}:{function}:{line} - {message}",
-        level="DEBUG",
-    )
-    try:
-        logger.remove(0)
-    except ValueError:
-        pass
+        if record["level"].name == "ERROR" and not _expecting_errors.get():
+            accumulated_errors.append(record["message"])
 
+    handler_id = logger.add(error_catching_sink, format="{message}", level="ERROR")
     try:
         yield
     except BaseException:
@@ -138,7 +121,6 @@ def explode_on_error() -> Generator[None, None, None]:
             raise IncorrectErrorsLoggedDuringTesting(f"Errors logged during testing: {accumulated_errors}")
     finally:
         logger.remove(handler_id)
-        logger.add(sys.stderr, level="DEBUG")
 
 
 def test_log_error(explode_on_error: Any) -> None:
@@ -163,3 +145,12 @@ def test_log_error_at_least(explode_on_error: Any) -> None:
     with pytest.raises(IncorrectErrorsLoggedDuringTesting):
         with expect_at_least_logged_errors({"Something bad happened", "Something else bad happened"}):
             logger.error("Something bad happened")
+
+
+def test_filter_exception_group_flattens_nested_groups_in_order() -> None:
+    first, second, third = ValueError("first"), KeyError("second"), TypeError("third")
+    exc_group = BaseExceptionGroup(
+        "outer",
+        [first, BaseExceptionGroup("inner", [asyncio.CancelledError(), ExceptionGroup("innermost", [second])]), third],
+    )
+    assert _filter_exception_group(exc_group) == [first, second, third]
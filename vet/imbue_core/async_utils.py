@@ -1,6 +1,10 @@
 import asyncio
+import contextvars
 import functools
+import os
+import sys
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Awaitable
 from typing import Callable
 from typing import ParamSpec
@@ -36,12 +40,22 @@ def _get_or_create_event_loop() -> asyncio.AbstractEventLoop:
         if _LOOP is not None:
             return _LOOP
         _LOOP = asyncio.new_event_loop()
+        if sys.version_info >= (3, 12):
+            # coroutines submitted by sync() start running right away instead of waiting for the next loop iteration
+            _LOOP.set_task_factory(asyncio.eager_task_factory)
         asyncio.set_event_loop(_LOOP)
         # pyre-ignore[16]: we have _LOOP_LOCK, so _LOOP is still not None
         threading.Thread(target=_LOOP.run_forever, daemon=True, name="async_loop").start()
     return _LOOP  # pyre-ignore[7]: we just made _LOOP, so it's not None unless it got destroyed just now
 
 
+# Blocking i/o wrapped with make_async gets its own threads rather than sharing the loop's default executor (which is
+# small, and is also what the loop uses for things like DNS lookups).
+_BLOCKING_IO_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("IMBUE_BLOCKING_IO_WORKERS", "32")), thread_name_prefix="make_async"
+)
+
+
 def make_async(func: Callable[P, R]) -> Callable[P, Awaitable[R]]:
     """
     Turn the annotated function into an async function by running it in a thread.
@@ -50,6 +64,10 @@ def make_async(func: Callable[P, R]) -> Callable[P, Awaitable[R]]:
     """
 
     async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
-        return await asyncio.to_thread(func, *args, **kwargs)
+        # same as asyncio.to_thread (including propagating contextvars), but on our own executor
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            _BLOCKING_IO_EXECUTOR, functools.partial(context.run, func, *args, **kwargs)
+        )
 
     return wrapper
@@ -21,6 +21,8 @@ ValueType = TypeVar("ValueType", covariant=True)
 
 
 class AsyncCacheInterface(Generic[ValueType]):
+    __slots__ = ()
+
     async def __aenter__(self) -> Self:
         raise NotImplementedError()
 
@@ -71,6 +73,9 @@ class AsyncCacheInterface(Generic[ValueType]):
 
 
 class AsyncCache(AsyncCacheInterface[ValueType], Generic[ValueType]):
+    # a new handle is created for every cached LLM call, so don't give each one a __dict__
+    __slots__ = ("path", "value_cls", "cache")
+
     def __init__(self, path: Path, value_cls: type[ValueType]) -> None:
         self.path = path
         self.value_cls = value_cls
@@ -115,8 +120,8 @@ class AsyncCache(AsyncCacheInterface[ValueType], Generic[ValueType]):
         assert cache is not None
         loop = asyncio.get_running_loop()
         assert isinstance(value, self.value_cls), f"Expected {self.value_cls}, got {type(value)}"
-        serialized_value = serialize_to_json(value)
-        return await loop.run_in_executor(None, cache.set, key, serialized_value, expire, read, tag, retry)
+        # serialize in the executor too, since that can take a while for large values and would block the loop
+        return await loop.run_in_executor(None, _serialize_and_set, cache, key, value, expire, read, tag, retry)
 
     async def get(
         self,
@@ -131,6 +136,10 @@ class AsyncCache(AsyncCacheInterface[ValueType], Generic[ValueType]):
         assert cache is not None
         loop = asyncio.get_running_loop()
         value = await loop.run_in_executor(None, cache.get, key, None, read, expire_time, tag, retry)
+        return self._deserialize(value, default)
+
+    # pyre-fixme[46]: ValueType is covariant
+    def _deserialize(self, value: str | None, default: ValueType | None) -> ValueType | None:
         if value is None:
             return default
         deserialized_value = deserialize_from_json(value)
@@ -139,7 +148,6 @@ class AsyncCache(AsyncCacheInterface[ValueType], Generic[ValueType]):
         ), f"Expected {self.value_cls}, got {type(deserialized_value)}"
         return deserialized_value
 
-    # TODO: this is not smart implementation, but at least it will be possible to optimize later without refactoring
     async def get_all(
         self,
         keys: Sequence[str],
@@ -149,11 +157,13 @@ class AsyncCache(AsyncCacheInterface[ValueType], Generic[ValueType]):
         tag: bool = False,
         retry: bool = False,
     ) -> FrozenMapping[str, ValueType | None]:
-        tasks = {}
-        for key in keys:
-            tasks[key] = self.get(key, default, read, expire_time, tag, retry)
-        results = await asyncio.gather(*tasks.values())
-        return FrozenDict(zip(tasks.keys(), results))
+        cache = self.cache
+        assert cache is not None
+        loop = asyncio.get_running_loop()
+        unique_keys = tuple(dict.fromkeys(keys))
+        # a single trip to the executor for all of the keys, rather than one task and executor job per key
+        values = await loop.run_in_executor(None, _get_many, cache, unique_keys, read, expire_time, tag, retry)
+        return FrozenDict((key, self._deserialize(value, default)) for key, value in zip(unique_keys, values))
 
     # TODO: might be nice to get iterkeys back someday, but whatever for now, too annoying to get the sync/async right
     async def get_all_keys(self, reverse: bool = False) -> tuple[str, ...]:
@@ -163,6 +173,18 @@ class AsyncCache(AsyncCacheInterface[ValueType], Generic[ValueType]):
         return tuple(await loop.run_in_executor(None, cache.iterkeys, reverse))
 
 
+def _serialize_and_set(
+    cache: Cache, key: str, value: object, expire: int | None, read: bool, tag: str | None, retry: bool
+) -> bool:
+    return cache.set(key, serialize_to_json(value), expire, read, tag, retry)
+
+
+def _get_many(
+    cache: Cache, keys: Sequence[str], read: bool, expire_time: bool, tag: bool, retry: bool
+) -> list[str | None]:
+    return [cache.get(key, None, read, expire_time, tag, retry) for key in keys]
+
+
 @lru_cache
 def get_cache(data_path: Path) -> Cache:
     # not sure if the size limit applies when eviction is none, but ~64GB should be enough for now
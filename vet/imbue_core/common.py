@@ -1,5 +1,6 @@
-import uuid
+import os
 
 
 def generate_id() -> str:
-    return uuid.uuid4().hex
+    # the same 32 random hex characters as uuid.uuid4().hex (minus the version bits), without building a UUID object
+    return os.urandom(16).hex()
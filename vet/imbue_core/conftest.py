@@ -1,6 +1,7 @@
 import contextlib
+import os
+import tempfile
 from pathlib import Path
-from tempfile import NamedTemporaryFile
 from typing import Generator
 from typing import Iterator
 
@@ -9,12 +10,13 @@ import pytest
 
 @contextlib.contextmanager
 def create_temp_file(contents: str, suffix: str, root_dir: Path) -> Generator[Path, None, None]:
-    with NamedTemporaryFile(mode="w", suffix=suffix, dir=root_dir, delete=False) as temp_file:
+    fd, name = tempfile.mkstemp(suffix=suffix, dir=root_dir)
+    with os.fdopen(fd, "w") as temp_file:
         temp_file.write(contents)
-        temp_file.flush()
-        yield Path(temp_file.name)
-        temp_file.close()
-        Path(temp_file.name).unlink()
+    try:
+        yield Path(name)
+    finally:
+        os.unlink(name)
 
 
 @contextlib.contextmanager
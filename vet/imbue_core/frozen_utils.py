@@ -1,9 +1,9 @@
 from abc import ABC
 from abc import abstractmethod
 from copy import deepcopy
-from functools import cached_property
 from typing import Any
 from typing import Iterable
+from typing import Iterator
 from typing import Mapping
 from typing import NoReturn
 from typing import TYPE_CHECKING
@@ -24,16 +24,15 @@ class FrozenMapping(Mapping[T, TV], ABC):
 
 
 class FrozenDict(dict[T, TV], FrozenMapping[T, TV]):
-    def _key(self) -> frozenset[tuple[T, TV]]:
-        return frozenset(self.items())
-
-    @cached_property
-    def _hash(self) -> int:
-        # bawr said it should be fine
-        return hash(self._key())
-
     def __hash__(self) -> int:  # type: ignore
-        return self._hash
+        # Stored straight in the instance __dict__ rather than through cached_property, since this is hit on every
+        # set/dict insertion. __reduce__ and __copy__ rebuild from the items, so the cached value is never carried over.
+        cached_hash = self.__dict__.get("_cached_hash")
+        if cached_hash is None:
+            # bawr said it should be fine
+            cached_hash = hash(frozenset(self.items()))
+            self.__dict__["_cached_hash"] = cached_hash
+        return cached_hash
 
     def _mutation_error(self, method: str) -> RuntimeError:
         return RuntimeError(f"Cannot call mutation method {method} on _FrozenDict {self}")
@@ -84,25 +83,99 @@ class FrozenDict(dict[T, TV], FrozenMapping[T, TV]):
 
 
 def deep_freeze_mapping(mapping: Mapping[T, TV]) -> FrozenDict[T, Any]:
-    return FrozenDict({key: cast(TV, _deep_freeze_any(value)) for key, value in mapping.items()})
+    return cast(FrozenDict[T, Any], _deep_freeze_container(_MAPPING, mapping))
 
 
-def _freeze_iterable_values(iterable: Iterable[T]) -> Iterable[Any]:
-    return (cast(T, _deep_freeze_any(value)) for value in iterable)
+def deep_freeze_set(input_set: set[T] | frozenset[T]) -> frozenset[Any]:
+    return cast(frozenset[Any], _deep_freeze_container(_SET, input_set))
 
 
-def deep_freeze_set(input_set: set[T] | frozenset[T]) -> frozenset[Any]:
-    return frozenset(_freeze_iterable_values(input_set))
+_IMMUTABLE_LEAF_TYPES = frozenset((str, bytes, int, float, bool, type(None)))
 
+_MAPPING = 0
+_SET = 1
+_SEQUENCE = 2
+
+
+def _get_container_kind(input_object: object) -> int | None:
+    # Exact type checks first: they are much cheaper than the abc isinstance checks below,
+    # and plain JSON-like values cover nearly every node we see.
+    input_type = type(input_object)
+    if input_type in _IMMUTABLE_LEAF_TYPES:
+        return None
+    if input_type is dict:
+        return _MAPPING
+    if input_type is list or input_type is tuple:
+        return _SEQUENCE
+    if input_type is set or input_type is frozenset:
+        return _SET
 
-def _deep_freeze_any(input_object: object) -> object:
     if isinstance(input_object, Mapping):
-        return deep_freeze_mapping(input_object)
+        return _MAPPING
 
     if isinstance(input_object, (set, frozenset)):
-        return deep_freeze_set(input_object)
+        return _SET
 
     if isinstance(input_object, Iterable) and not isinstance(input_object, str) and not isinstance(input_object, bytes):
-        return tuple(_freeze_iterable_values(input_object))
+        return _SEQUENCE
+
+    return None
+
+
+class _FreezeFrame:
+    """A container whose children are being frozen, along with the frozen children seen so far."""
+
+    __slots__ = ("kind", "container_id", "keys", "children", "frozen_children")
+
+    def __init__(self, kind: int, container: Any) -> None:
+        self.kind = kind
+        self.container_id = id(container)
+        if kind == _MAPPING:
+            self.keys: tuple[Any, ...] = tuple(container.keys())
+            self.children: Iterator[Any] = iter(container.values())
+        else:
+            self.keys = ()
+            self.children = iter(container)
+        self.frozen_children: list[Any] = []
+
+    def build(self) -> object:
+        if self.kind == _MAPPING:
+            return FrozenDict(zip(self.keys, self.frozen_children))
+        if self.kind == _SET:
+            return frozenset(self.frozen_children)
+        return tuple(self.frozen_children)
+
+
+def _deep_freeze_container(kind: int, container: object) -> object:
+    # Walks the tree with an explicit stack rather than recursing, so deeply nested values
+    # neither pay for a Python frame per node nor run into the recursion limit.
+    stack = [_FreezeFrame(kind, container)]
+    # ids of the containers currently on the stack, so that a container nested inside itself fails instead of
+    # pushing frames forever
+    ancestor_ids = {id(container)}
+    while True:
+        frame = stack[-1]
+        for child in frame.children:
+            child_kind = _get_container_kind(child)
+            if child_kind is None:
+                frame.frozen_children.append(child)
+            else:
+                if id(child) in ancestor_ids:
+                    raise ValueError("cannot freeze a cyclic structure")
+                ancestor_ids.add(id(child))
+                stack.append(_FreezeFrame(child_kind, child))
+                break
+        else:
+            stack.pop()
+            ancestor_ids.discard(frame.container_id)
+            frozen = frame.build()
+            if not stack:
+                return frozen
+            stack[-1].frozen_children.append(frozen)
 
-    return input_object
+
+def _deep_freeze_any(input_object: object) -> object:
+    kind = _get_container_kind(input_object)
+    if kind is None:
+        return input_object
+    return _deep_freeze_container(kind, input_object)
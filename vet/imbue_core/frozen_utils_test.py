@@ -0,0 +1,35 @@
+from typing import Any
+
+import pytest
+
+from vet.imbue_core.frozen_utils import FrozenDict
+from vet.imbue_core.frozen_utils import deep_freeze_mapping
+
+
+def test_deep_freeze_mapping_freezes_nested_values() -> None:
+    shared = [1, 2]
+    frozen = deep_freeze_mapping({"a": [shared, {"b": {3}}], "c": shared, "d": None})
+    assert frozen == FrozenDict({"a": ((1, 2), FrozenDict({"b": frozenset({3})})), "c": (1, 2), "d": None})
+    assert isinstance(frozen["a"][1], FrozenDict)
+
+
+def test_deep_freeze_mapping_handles_deep_nesting() -> None:
+    nested: list[Any] = []
+    for _ in range(10_000):
+        nested = [nested]
+    frozen = deep_freeze_mapping({"x": nested})
+    assert isinstance(frozen["x"], tuple)
+
+
+def test_deep_freeze_mapping_rejects_cyclic_dict() -> None:
+    cyclic: dict[str, Any] = {}
+    cyclic["x"] = cyclic
+    with pytest.raises(ValueError, match="cyclic"):
+        deep_freeze_mapping(cyclic)
+
+
+def test_deep_freeze_mapping_rejects_cyclic_list() -> None:
+    cyclic: list[Any] = [1]
+    cyclic.append([cyclic])
+    with pytest.raises(ValueError, match="cyclic"):
+        deep_freeze_mapping({"x": cyclic})
@@ -31,6 +31,13 @@ class ContextFormatStyle(Enum):
     HIDDEN = "HIDDEN"
 
 
+@functools.lru_cache(maxsize=1024)
+def _compile_git_ignore_spec(lines: tuple[str, ...]) -> GitIgnoreSpec:
+    # equal patterns are built over and over (e.g. one per parent directory of every relevant file, or when
+    # deserialized), so share the compiled regexes between them
+    return GitIgnoreSpec.from_lines(lines)
+
+
 class BaseFilenamePattern(SerializableModel):
     """
     Extends the functionality of `GitIgnoreSpec` to be serializable.
@@ -41,7 +48,7 @@ class BaseFilenamePattern(SerializableModel):
 
     @functools.cached_property
     def git_ignore_spec(self) -> GitIgnoreSpec:
-        return GitIgnoreSpec.from_lines(self.lines)
+        return _compile_git_ignore_spec(self.lines)
 
     @classmethod
     def from_lines(cls, lines: Iterable[str]) -> Self:
@@ -314,8 +321,8 @@ def build_context_from_filecontexts(
             contents.path: ContextFormatStyle.FULL_FILE for contents in repo_contents_with_hidden_removed
         }
 
-    is_shortened = any([style != ContextFormatStyle.FULL_FILE for style in path_to_format_style.values()])
-    has_hidden_files = any([style == ContextFormatStyle.HIDDEN for style in path_to_format_style.values()])
+    is_shortened = any(style != ContextFormatStyle.FULL_FILE for style in path_to_format_style.values())
+    has_hidden_files = any(style == ContextFormatStyle.HIDDEN for style in path_to_format_style.values())
 
     repo_context_prompt = formatted_subrepo_to_prompt(
         repo_context_str=repo_context_str,